@@ -1,10 +1,113 @@
 import streamlit as st
 import google.generativeai as genai
 import requests
+from requests.adapters import HTTPAdapter
 import tempfile
-import os
 from pathlib import Path
 import time
+import json
+import typing
+import hashlib
+import mimetypes
+from urllib.parse import urlparse
+import cache as result_cache
+import queue
+import threading
+import mmap
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+
+# Download tuning
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB per read
+PROGRESS_STEP = 0.01  # Minimum progress bar change between redraws
+WRITE_QUEUE_SIZE = 8  # Chunks buffered between the network and disk writer
+DOWNLOAD_PARTS = 8  # Concurrent Range requests for large downloads
+PARALLEL_MIN_SIZE = 16 * 1024 * 1024  # Smaller files use a single stream
+SPOOL_MAX_SIZE = 64 * 1024 * 1024  # Single-stream downloads stay in RAM up to this size
+MAX_VIDEO_SIZE = 2 * 1024 * 1024 * 1024  # Gemini Files API limit
+DOCUMENT_CONTENT_TYPES = {  # Non-text/* types that mean the URL isn't a video
+    'application/xhtml+xml',
+    'application/json',
+    'application/xml',
+}
+
+# Gemini processing poll
+POLL_INITIAL_DELAY = 2.0  # Seconds before the first status check
+POLL_BACKOFF = 1.5  # Delay multiplier after each check
+POLL_MAX_DELAY = 15.0  # Upper bound on the delay between checks
+UI_REFRESH_INTERVAL = 0.5  # Seconds between status redraws while waiting
+
+# Gemini prompts
+MODEL_NAME = 'gemini-1.5-flash'
+
+ANALYSIS_INSTRUCTIONS = """
+Please extract ALL text content from the video you are given including:
+1. All spoken dialogue and narration (transcribe speech to text)
+2. Any text that appears on screen (titles, captions, signs, etc.)
+3. Any other textual information visible in the video
+
+Put the complete spoken transcript in chronological order in "transcript",
+marking speaker changes when there are multiple speakers. Put text that
+appears on screen in "on_screen_text" and list the speakers by name or
+role in "speakers".
+
+Also create a comprehensive summary of the video's content. Provide:
+1. A brief overview (2-3 sentences)
+2. Key points and main topics discussed
+3. Important details or conclusions
+4. Any notable quotes or statements
+
+Make the summary clear, concise, and well-organized, and put it in "summary".
+"""
+
+# Used when the combined reply runs out of output tokens, so the transcript
+# and the summary each get their own token budget again
+EXTRACTION_INSTRUCTIONS = """
+Please extract ALL text content from the video you are given including:
+1. All spoken dialogue and narration (transcribe speech to text)
+2. Any text that appears on screen (titles, captions, signs, etc.)
+3. Any other textual information visible in the video
+
+Provide the complete transcript in chronological order.
+If there are multiple speakers, indicate speaker changes.
+"""
+
+SUMMARY_INSTRUCTIONS = """
+Please create a comprehensive summary of the text extracted from a video that you are given.
+
+Provide:
+1. A brief overview (2-3 sentences)
+2. Key points and main topics discussed
+3. Important details or conclusions
+4. Any notable quotes or statements
+
+Make the summary clear, concise, and well-organized.
+"""
+
+
+class VideoAnalysis(typing.TypedDict):
+    """Response schema for the combined extraction and summary request.
+    
+    Gemini fills the properties in alphabetical order, so the summary is
+    written before the transcript and must not depend on it.
+    """
+    transcript: str
+    on_screen_text: str
+    speakers: list[str]
+    summary: str
+
+
+# Part of every cached result's key, so editing the model, prompt or
+# response schema invalidates results produced by the old one
+PROMPT_VERSION_DIGEST = hashlib.sha256(
+    "\n".join([
+        MODEL_NAME,
+        ANALYSIS_INSTRUCTIONS,
+        EXTRACTION_INSTRUCTIONS,
+        SUMMARY_INSTRUCTIONS,
+        str(typing.get_type_hints(VideoAnalysis)),
+    ]).encode('utf-8')
+).hexdigest()[:16]
+
 
 # Page configuration
 st.set_page_config(
@@ -14,35 +117,12 @@ st.set_page_config(
 )
 
 # Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        text-align: center;
-        padding: 1rem 0;
-        background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border-radius: 10px;
-        margin-bottom: 2rem;
-    }
-    .result-box {
-        background-color: ##000000;
-        padding: 1rem;
-        border-radius: 8px;
-        border-left: 4px solid #007bff;
-        margin: 1rem 0;
-    }
-    .summary-box {
-        background-color: ##000000;
-        padding: 1rem;
-        border-radius: 8px;
-        border-left: 4px solid #28a745;
-        margin: 1rem 0;
-    }
-    .stProgress > div > div > div > div {
-        background-color: #667eea;
-    }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def _load_css():
+    """Read the stylesheet once per server process"""
+    return (Path(__file__).parent / "assets" / "style.css").read_text()
+
+st.markdown(f"<style>{_load_css()}</style>", unsafe_allow_html=True)
 
 # Header
 st.markdown("""
@@ -52,47 +132,327 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+class RangeNotSupported(Exception):
+    """Server answered a Range request with the full body"""
+
+
 class StreamlitVideoExtractor:
     def __init__(self, api_key):
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        # The fixed instructions live in the system instruction so only the
+        # video has to be sent with every request
+        self.model = genai.GenerativeModel(
+            MODEL_NAME,
+            system_instruction=ANALYSIS_INSTRUCTIONS,
+            generation_config={
+                'response_mime_type': 'application/json',
+                'response_schema': VideoAnalysis,
+            }
+        )
+        self.extraction_model = genai.GenerativeModel(
+            MODEL_NAME, system_instruction=EXTRACTION_INSTRUCTIONS
+        )
+        self.summary_model = genai.GenerativeModel(
+            MODEL_NAME, system_instruction=SUMMARY_INSTRUCTIONS
+        )
+        
+        # One keep-alive pool for the HEAD probe and every download request,
+        # sized so each parallel range worker can hold its own connection
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=DOWNLOAD_PARTS)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+        
+        # Open the Gemini connection in the background while the user is
+        # still choosing a video, so the first real call finds it warm
+        threading.Thread(target=self._warm_up, daemon=True).start()
+    
+    def _warm_up(self):
+        """Issue a free count_tokens call to set up the Gemini channel"""
+        try:
+            self.model.count_tokens("warmup")
+        except Exception:
+            # A bad key or network problem surfaces on the first real call
+            pass
     
     def download_video(self, video_url):
-        """Download video from URL"""
+        """Download video from URL into a temporary file object.
+        
+        Returns (file object, mime type, SHA-256 hex digest), or
+        (None, None, None) on failure. The file is rewound and disappears
+        from disk once closed.
+        """
         try:
             with st.spinner("📥 Downloading video..."):
-                response = requests.get(video_url, stream=True)
-                response.raise_for_status()
+                total_size, accepts_ranges, content_type = self._probe_video_url(video_url)
+                
+                # Reject obvious non-videos from the headers alone instead of
+                # after transferring the whole body
+                problem = self._header_problem(content_type, total_size)
+                if problem:
+                    st.error(f"❌ {problem}")
+                    return None, None, None
                 
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
+                downloaded = None
+                if accepts_ranges and total_size >= PARALLEL_MIN_SIZE:
+                    downloaded = self._parallel_download(video_url, total_size)
+                if downloaded is None:
+                    downloaded = self._stream_download(video_url)
+                
+                video_buffer, video_digest = downloaded
+                video_buffer.seek(0)
+                st.success("✅ Video downloaded successfully!")
+                return video_buffer, self._video_mime_type(content_type, video_url), video_digest
+                
+        except Exception as e:
+            st.error(f"❌ Error downloading video: {str(e)}")
+            return None, None, None
+    
+    def _probe_video_url(self, video_url):
+        """Return (content length, Range support, content type) from a HEAD request"""
+        try:
+            response = self.http.head(video_url, allow_redirects=True, timeout=10)
+        except requests.RequestException:
+            return 0, False, ''
+        
+        if not response.ok:
+            return 0, False, ''
+        
+        total_size = int(response.headers.get('content-length', 0))
+        accepts_ranges = response.headers.get('accept-ranges', '').lower() == 'bytes'
+        content_type = response.headers.get('content-type', '').split(';')[0].strip()
+        return total_size, accepts_ranges, content_type
+    
+    @classmethod
+    def _header_problem(cls, content_type, total_size):
+        """Describe why response headers rule out a usable video, or None"""
+        if cls._is_document_content_type(content_type):
+            return f"URL does not point to a video (Content-Type: {content_type})"
+        if total_size > MAX_VIDEO_SIZE:
+            return f"Video is {total_size / 1024**3:.1f} GB; the maximum supported size is 2 GB"
+        return None
+    
+    @staticmethod
+    def _is_document_content_type(content_type):
+        """True for page and data types that can never be a video.
+        
+        Anything else is let through, since direct video links are often
+        served as generic binary types such as binary/octet-stream.
+        """
+        content_type = content_type.lower()
+        return content_type.startswith('text/') or content_type in DOCUMENT_CONTENT_TYPES
+    
+    @staticmethod
+    def _video_mime_type(content_type, video_url):
+        """Pick a mime type for Gemini, which needs one for file objects"""
+        if content_type.startswith('video/'):
+            return content_type
+        guessed, _ = mimetypes.guess_type(urlparse(video_url).path)
+        if guessed and guessed.startswith('video/'):
+            return guessed
+        return 'video/mp4'
+    
+    def _parallel_download(self, video_url, total_size, parts=DOWNLOAD_PARTS):
+        """Fetch the video as concurrent byte ranges into a pre-sized file.
+        
+        Returns (file object, SHA-256 hex digest), or None when the server
+        ignores Range so the caller can fall back to a single stream.
+        """
+        # Workers copy straight into a shared mapping of the pre-sized file;
+        # their ranges never overlap so no locking is needed for the data
+        temp_file = tempfile.TemporaryFile()
+        temp_file.truncate(total_size)
+        video_map = mmap.mmap(temp_file.fileno(), total_size)
+        
+        part_size = -(-total_size // parts)
+        ranges = [
+            (start, min(start + part_size, total_size) - 1)
+            for start in range(0, total_size, part_size)
+        ]
+        
+        progress_bar = st.progress(0)
+        downloaded = [0]
+        lock = threading.Lock()
+        
+        # Set on the first failure and on any exit, including a Streamlit
+        # rerun, so the remaining workers stop after their current chunk
+        cancel = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=len(ranges))
+        completed = False
+        
+        try:
+            futures = [
+                executor.submit(
+                    self._download_range, video_url, video_map,
+                    start, end, downloaded, lock, cancel
+                )
+                for start, end in ranges
+            ]
+            
+            pending = futures
+            while pending:
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_EXCEPTION)
+                progress_bar.progress(min(downloaded[0] / total_size, 1.0))
+                for future in done:
+                    if future.exception():
+                        raise future.exception()
+            
+            # Ranges finish out of order, so hash the mapping once at the end
+            # while its pages are still hot in the page cache
+            video_digest = hashlib.sha256(video_map).hexdigest()
+            completed = True
+            return temp_file, video_digest
+        except RangeNotSupported:
+            # The single-stream fallback draws its own bar
+            progress_bar.empty()
+            return None
+        finally:
+            cancel.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            video_map.close()
+            if not completed:
+                temp_file.close()
+    
+    def _download_range(self, video_url, video_map, start, end, downloaded, lock, cancel):
+        """Copy bytes start..end (inclusive) of the video into video_map.
+        
+        Returns early, leaving the range incomplete, once cancel is set.
+        """
+        headers = {'Range': f'bytes={start}-{end}'}
+        with self.http.get(video_url, headers=headers, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise RangeNotSupported(video_url)
+            
+            offset = start
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if cancel.is_set():
+                    return
+                if offset + len(chunk) > end + 1:
+                    raise IOError(f"Range {start}-{end} returned more data than requested")
+                video_map[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+                with lock:
+                    downloaded[0] += len(chunk)
+        
+        if offset != end + 1:
+            raise IOError(f"Incomplete range {start}-{end}: got {offset - start} bytes")
+    
+    def _stream_download(self, video_url):
+        """Download the video over a single connection.
+        
+        Returns (file object, SHA-256 hex digest).
+        """
+        with self.http.get(video_url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            
+            # HEAD may have been refused (e.g. presigned S3 URLs), so check the
+            # GET headers too before reading any of the body
+            content_type = response.headers.get('content-type', '').split(';')[0].strip()
+            total_size = int(response.headers.get('content-length', 0))
+            problem = self._header_problem(content_type, total_size)
+            if problem:
+                raise ValueError(problem)
+            
+            # Gemini's resumable upload needs a seekable file, so buffer the
+            # stream in memory and only spill to disk for larger videos
+            temp_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            completed = False
+            
+            try:
+                # Disk writes happen on a background thread so the next
+                # network read never waits for the previous write to finish
+                chunks = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+                write_errors = []
+                writer = threading.Thread(
+                    target=self._write_chunks,
+                    args=(temp_file, chunks, write_errors),
+                    daemon=True
+                )
+                writer.start()
                 
                 # Progress bar for download
-                total_size = int(response.headers.get('content-length', 0))
                 downloaded = 0
+                reported = 0.0
+                hasher = hashlib.sha256()
                 
                 if total_size > 0:
                     progress_bar = st.progress(0)
-                    
-                for chunk in response.iter_content(chunk_size=8192):
-                    temp_file.write(chunk)
-                    if total_size > 0:
-                        downloaded += len(chunk)
-                        progress_bar.progress(downloaded / total_size)
                 
-                temp_file.close()
-                st.success("✅ Video downloaded successfully!")
-                return temp_file.name
+                try:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if write_errors:
+                            break
+                        chunks.put(chunk)
+                        hasher.update(chunk)
+                        if total_size > 0:
+                            downloaded += len(chunk)
+                            # Every st.progress call is a websocket frame, so only
+                            # redraw when the bar has moved by at least 1%
+                            fraction = min(downloaded / total_size, 1.0)
+                            if fraction - reported >= PROGRESS_STEP or fraction == 1.0:
+                                progress_bar.progress(fraction)
+                                reported = fraction
+                finally:
+                    chunks.put(None)
+                    writer.join()
                 
-        except Exception as e:
-            st.error(f"❌ Error downloading video: {str(e)}")
-            return None
+                if write_errors:
+                    raise write_errors[0]
+                
+                completed = True
+                return temp_file, hasher.hexdigest()
+            finally:
+                if not completed:
+                    temp_file.close()
     
-    def upload_video_to_gemini(self, video_path):
-        """Upload video to Gemini and wait for processing"""
+    @staticmethod
+    def _write_chunks(temp_file, chunks, write_errors):
+        """Drain downloaded chunks to disk until the None sentinel arrives"""
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                return
+            if write_errors:
+                continue
+            try:
+                temp_file.write(chunk)
+            except Exception as e:
+                write_errors.append(e)
+    
+    def upload_video_to_gemini(self, video_source, mime_type=None, video_digest=None):
+        """Upload video (a path or file-like object) to Gemini and wait for processing.
+        
+        When video_digest is given, an upload of the same content from
+        earlier in this session is reused while Gemini still has it.
+        """
+        if video_digest:
+            video_file = self._find_uploaded_file(video_digest)
+            if video_file:
+                st.success("✅ Reusing video already uploaded to Gemini!")
+                return video_file
+        
         try:
-            with st.spinner("☁️ Uploading video to Gemini..."):
-                video_file = genai.upload_file(path=video_path)
-                st.success("✅ Video uploaded to Gemini!")
+            # The upload and the state polling run on a worker thread while
+            # this (script) thread keeps the status widgets moving. The worker
+            # is never joined, so a Streamlit rerun or stop is not held up
+            executor = ThreadPoolExecutor(max_workers=1)
+            stop = threading.Event()
+            try:
+                with st.spinner("☁️ Uploading video to Gemini..."):
+                    if hasattr(video_source, 'read'):
+                        video_source.seek(0)
+                    status_text = st.empty()
+                    upload_future = executor.submit(
+                        genai.upload_file, video_source, mime_type=mime_type
+                    )
+                    start_time = time.monotonic()
+                    while not upload_future.done():
+                        status_text.text(f"Uploading... ({time.monotonic() - start_time:.0f}s)")
+                        wait([upload_future], timeout=UI_REFRESH_INTERVAL)
+                    status_text.empty()
+                    video_file = upload_future.result()
+                    st.success("✅ Video uploaded to Gemini!")
                 
                 # Wait for file to be processed
                 st.info("⏳ Waiting for video to be processed by Gemini (this may take a few minutes)...")
@@ -101,21 +461,28 @@ class StreamlitVideoExtractor:
                 status_text = st.empty()
                 
                 max_wait_time = 300  # 5 minutes max wait
-                wait_time = 0
+                start_time = time.monotonic()
+                latest = [video_file]
+                state_changed = threading.Event()
+                poll_future = executor.submit(
+                    self._poll_processing, video_file, max_wait_time, latest, state_changed, stop
+                )
                 
-                while video_file.state.name == "PROCESSING":
-                    wait_time += 2
+                while not poll_future.done():
+                    wait_time = time.monotonic() - start_time
                     progress = min(wait_time / max_wait_time, 0.9)  # Don't go to 100% until done
                     progress_bar.progress(progress)
                     
-                    status_text.text(f"Processing... ({wait_time}s) - Status: {video_file.state.name}")
-                    
-                    if wait_time > max_wait_time:
-                        st.error("⏰ Processing timeout. Please try with a shorter video.")
-                        return None
+                    status_text.text(f"Processing... ({wait_time:.0f}s) - Status: {latest[0].state.name}")
                     
-                    time.sleep(2)
-                    video_file = genai.get_file(video_file.name)
+                    state_changed.wait(timeout=UI_REFRESH_INTERVAL)
+                    state_changed.clear()
+                
+                video_file = poll_future.result()
+                
+                if video_file.state.name == "PROCESSING":
+                    st.error("⏰ Processing timeout. Please try with a shorter video.")
+                    return None
                 
                 progress_bar.progress(1.0)
                 status_text.empty()
@@ -125,62 +492,130 @@ class StreamlitVideoExtractor:
                     return None
                 elif video_file.state.name == "ACTIVE":
                     st.success("✅ Video is ready for analysis!")
+                    if video_digest:
+                        st.session_state.setdefault('gemini_files', {})[video_digest] = video_file.name
                     return video_file
                 else:
                     st.warning(f"⚠️ Unexpected file state: {video_file.state.name}")
                     return None
+            finally:
+                stop.set()
+                executor.shutdown(wait=False, cancel_futures=True)
                     
         except Exception as e:
             st.error(f"❌ Error uploading video: {str(e)}")
             return None
     
-    def extract_text_from_video(self, video_file):
-        """Extract text from video"""
+    @staticmethod
+    def _find_uploaded_file(video_digest):
+        """Return the session's ACTIVE Gemini file for video_digest, if any"""
+        file_name = st.session_state.get('gemini_files', {}).get(video_digest)
+        if not file_name:
+            return None
+        
         try:
-            with st.spinner("🔍 Extracting text from video..."):
-                prompt = """
-                Please extract ALL text content from this video including:
-                1. All spoken dialogue and narration (transcribe speech to text)
-                2. Any text that appears on screen (titles, captions, signs, etc.)
-                3. Any other textual information visible in the video
-                
-                Provide the complete transcript in chronological order.
-                If there are multiple speakers, indicate speaker changes.
-                """
+            video_file = genai.get_file(file_name)
+        except Exception:
+            video_file = None
+        
+        if video_file is None or video_file.state.name != "ACTIVE":
+            # Expired or deleted on Gemini's side
+            del st.session_state['gemini_files'][video_digest]
+            return None
+        return video_file
+    
+    @staticmethod
+    def _poll_processing(video_file, max_wait_time, latest, state_changed, stop):
+        """Poll until the file leaves PROCESSING, times out or stop is set.
+        
+        Runs off the script thread, so it reports through latest and
+        state_changed instead of touching Streamlit widgets.
+        """
+        start_time = time.monotonic()
+        delay = POLL_INITIAL_DELAY
+        
+        try:
+            while video_file.state.name == "PROCESSING":
+                remaining = max_wait_time - (time.monotonic() - start_time)
+                if remaining < 0:
+                    break
                 
-                response = self.model.generate_content([video_file, prompt])
-                st.success("✅ Text extraction completed!")
-                return response.text
+                # Back off between polls so long videos don't burn the request
+                # quota; waiting on stop lets an abandoned script end it early
+                if stop.wait(timeout=min(delay, remaining + 1)):
+                    break
+                delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+                video_file = genai.get_file(video_file.name)
+                latest[0] = video_file
+                state_changed.set()
+        finally:
+            state_changed.set()
+        
+        return video_file
+    
+    def extract_and_summarize(self, video_file):
+        """Extract text from video and summarize it in one request.
+        
+        Returns a dict shaped like VideoAnalysis. If the combined reply hits
+        the output token limit, the transcript and summary are requested
+        separately instead and only those two keys are filled in.
+        """
+        try:
+            with st.spinner("🔍 Extracting text and creating summary..."):
+                response = self.model.generate_content(video_file)
+                if not self._hit_token_limit(response):
+                    analysis = json.loads(response.text)
+                    st.success("✅ Text extraction and summary completed!")
+                    return analysis
                 
         except Exception as e:
             st.error(f"❌ Error extracting text: {str(e)}")
             return None
+        
+        st.warning("⚠️ Video is too long for a single request; extracting text and summarizing separately...")
+        return self._extract_then_summarize(video_file)
     
-    def summarize_text(self, extracted_text):
-        """Create summary"""
+    def _extract_then_summarize(self, video_file):
+        """Fallback: one request for the transcript, another for its summary"""
         try:
+            with st.spinner("🔍 Extracting text from video..."):
+                response = self.extraction_model.generate_content(video_file)
+                transcript = response.text
+                if self._hit_token_limit(response):
+                    st.warning("⚠️ Transcript was cut off at Gemini's output limit.")
+                st.success("✅ Text extraction completed!")
+            
             with st.spinner("📝 Creating summary..."):
-                prompt = f"""
-                Please create a comprehensive summary of the following text extracted from a video:
-
-                {extracted_text}
-
-                Provide:
-                1. A brief overview (2-3 sentences)
-                2. Key points and main topics discussed
-                3. Important details or conclusions
-                4. Any notable quotes or statements
-
-                Make the summary clear, concise, and well-organized.
-                """
-                
-                response = self.model.generate_content(prompt)
+                response = self.summary_model.generate_content(transcript)
                 st.success("✅ Summary created!")
-                return response.text
+                return {'transcript': transcript, 'summary': response.text}
                 
         except Exception as e:
-            st.error(f"❌ Error creating summary: {str(e)}")
+            st.error(f"❌ Error extracting text: {str(e)}")
             return None
+    
+    @staticmethod
+    def _hit_token_limit(response):
+        """True if generation stopped because it ran out of output tokens"""
+        return bool(response.candidates) and response.candidates[0].finish_reason.name == "MAX_TOKENS"
+    
+    @staticmethod
+    def format_extracted_text(analysis):
+        """Render the structured extraction fields as plain text"""
+        sections = []
+        if analysis.get('speakers'):
+            sections.append(f"SPEAKERS: {', '.join(analysis['speakers'])}")
+        sections.append(analysis.get('transcript', ''))
+        if analysis.get('on_screen_text'):
+            sections.append(f"ON-SCREEN TEXT:\n{analysis['on_screen_text']}")
+        return '\n\n'.join(sections)
+
+# genai.configure is process-wide, so keep only the extractor for the
+# current key; switching keys rebuilds it and reconfigures the client
+@st.cache_resource(max_entries=1)
+def get_extractor(api_key):
+    """Build the extractor once and reuse it across script reruns"""
+    return StreamlitVideoExtractor(api_key)
 
 def main():
     # Sidebar for configuration
@@ -199,7 +634,7 @@ def main():
         return
     
     # Initialize extractor
-    extractor = StreamlitVideoExtractor(api_key)
+    extractor = get_extractor(api_key)
     
     # Main interface
     st.header("📤 Upload or Provide Video")
@@ -207,7 +642,9 @@ def main():
     # Tab selection
     tab1, tab2 = st.tabs(["🔗 Video URL", "📁 Upload File"])
     
-    video_path = None
+    video_source = None
+    mime_type = None
+    video_digest = None
     
     with tab1:
         st.subheader("Enter Video URL")
@@ -219,7 +656,7 @@ def main():
         
         if st.button("🚀 Process Video from URL", type="primary"):
             if video_url:
-                video_path = extractor.download_video(video_url)
+                video_source, mime_type, video_digest = extractor.download_video(video_url)
             else:
                 st.error("Please enter a video URL")
     
@@ -233,87 +670,95 @@ def main():
         
         if st.button("🚀 Process Uploaded Video", type="primary"):
             if uploaded_file is not None:
-                # Save uploaded file temporarily
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    video_path = tmp_file.name
-                    st.success("✅ File uploaded successfully!")
+                # The upload is already an in-memory file object, so hand it
+                # to Gemini directly instead of copying it to disk first
+                video_source = uploaded_file
+                mime_type = uploaded_file.type or 'video/mp4'
+                video_digest = result_cache.file_digest(uploaded_file)
+                st.success("✅ File uploaded successfully!")
             else:
                 st.error("Please upload a video file")
     
-    # Process video if path is available
-    if video_path:
+    # Process video if one is available
+    if video_source is not None:
         st.header("🔄 Processing")
         
         # Create progress tracker
         progress_container = st.container()
         
         with progress_container:
-            # Upload to Gemini
-            video_file = extractor.upload_video_to_gemini(video_path)
+            # Identical videos reuse earlier results without re-uploading
+            analysis_key = f"analysis:{PROMPT_VERSION_DIGEST}:{video_digest}"
+            analysis = result_cache.get_result(analysis_key)
             
-            if video_file:
-                # Extract text
-                extracted_text = extractor.extract_text_from_video(video_file)
+            if analysis is not None:
+                st.success("✅ Loaded results from cache!")
+            else:
+                # Upload to Gemini
+                video_file = extractor.upload_video_to_gemini(video_source, mime_type, video_digest)
+                
+                if video_file:
+                    # Extract text and summarize in a single request
+                    analysis = extractor.extract_and_summarize(video_file)
+                    if analysis:
+                        result_cache.store_result(analysis_key, analysis)
+            
+            if analysis:
+                extracted_text = extractor.format_extracted_text(analysis)
+                summary = analysis.get('summary', '')
+                
+                # Display results
+                st.header("📊 Results")
+                
+                # Create two columns for results
+                col1, col2 = st.columns([1, 1])
                 
-                if extracted_text:
-                    # Create summary
-                    summary = extractor.summarize_text(extracted_text)
+                with col1:
+                    st.subheader("📝 Extracted Text")
+                    st.text_area(
+                        "Extracted Text",
+                        extracted_text,
+                        height=500,
+                        label_visibility="collapsed"
+                    )
                     
-                    if summary:
-                        # Display results
-                        st.header("📊 Results")
-                        
-                        # Create two columns for results
-                        col1, col2 = st.columns([1, 1])
-                        
-                        with col1:
-                            st.subheader("📝 Extracted Text")
-                            st.markdown(f"""
-                            <div class="result-box">
-                                {extracted_text.replace('\n', '<br>')}
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            # Download button for extracted text
-                            st.download_button(
-                                label="📥 Download Extracted Text",
-                                data=extracted_text,
-                                file_name="extracted_text.txt",
-                                mime="text/plain"
-                            )
-                        
-                        with col2:
-                            st.subheader("📋 Summary")
-                            st.markdown(f"""
-                            <div class="summary-box">
-                                {summary.replace('\n', '<br>')}
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
-                            # Download button for summary
-                            st.download_button(
-                                label="📥 Download Summary",
-                                data=summary,
-                                file_name="video_summary.txt",
-                                mime="text/plain"
-                            )
-                        
-                        # Combined download
-                        combined_text = f"EXTRACTED TEXT:\n{'-'*50}\n{extracted_text}\n\n\nSUMMARY:\n{'-'*50}\n{summary}"
-                        st.download_button(
-                            label="📥 Download Complete Report",
-                            data=combined_text,
-                            file_name="video_analysis_report.txt",
-                            mime="text/plain"
-                        )
-        
-        # Cleanup
-        try:
-            if os.path.exists(video_path):
-                os.unlink(video_path)
-        except:
-            pass
+                    # Download button for extracted text
+                    st.download_button(
+                        label="📥 Download Extracted Text",
+                        data=extracted_text,
+                        file_name="extracted_text.txt",
+                        mime="text/plain"
+                    )
+                
+                with col2:
+                    st.subheader("📋 Summary")
+                    st.text_area(
+                        "Summary",
+                        summary,
+                        height=500,
+                        label_visibility="collapsed"
+                    )
+                    
+                    # Download button for summary
+                    st.download_button(
+                        label="📥 Download Summary",
+                        data=summary,
+                        file_name="video_summary.txt",
+                        mime="text/plain"
+                    )
+                
+                # Combined download
+                combined_text = f"EXTRACTED TEXT:\n{'-'*50}\n{extracted_text}\n\n\nSUMMARY:\n{'-'*50}\n{summary}"
+                st.download_button(
+                    label="📥 Download Complete Report",
+                    data=combined_text,
+                    file_name="video_analysis_report.txt",
+                    mime="text/plain"
+                )
+
+        # Cleanup: downloaded videos are temporary files that vanish on close
+        if video_source is not uploaded_file:
+            video_source.close()
     
     # Sidebar information
     st.sidebar.markdown("---")
@@ -0,0 +1,50 @@
+"""Content-addressed cache for Gemini extraction and summary results"""
+import diskcache
+import hashlib
+import os
+import tempfile
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "v2t_cache")
+EXPIRE_SECONDS = 7 * 24 * 60 * 60  # Keep results for a week
+
+_cache = None
+
+
+def file_digest(source):
+    """SHA-256 of a seekable binary file object, left rewound to the start.
+    
+    In-memory uploads are hashed straight from their buffer, so the video
+    is never copied.
+    """
+    source.seek(0)
+    digest = hashlib.file_digest(source, 'sha256').hexdigest()
+    source.seek(0)
+    return digest
+
+
+def _open_cache():
+    """Open the cache on first use so a broken cache dir can't stop the app loading"""
+    global _cache
+    if _cache is None:
+        _cache = diskcache.Cache(CACHE_DIR)
+    return _cache
+
+
+def get_result(key):
+    """Return the cached value for key, or None on a miss or cache error"""
+    try:
+        return _open_cache().get(key)
+    except Exception:
+        return None
+
+
+def store_result(key, value):
+    """Cache value under key for EXPIRE_SECONDS.
+    
+    Failures (disk full, locked database) are ignored; the caller already
+    has the value and only loses the chance to reuse it.
+    """
+    try:
+        _open_cache().set(key, value, expire=EXPIRE_SECONDS)
+    except Exception:
+        pass